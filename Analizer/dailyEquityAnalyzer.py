@@ -1,7 +1,8 @@
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
-from datetime import datetime
+from datetime import datetime, date
 import matplotlib.dates as mdates
 import pytz
 import os
@@ -9,75 +10,206 @@ import glob
 import re
 import argparse
 import sys
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from matplotlib.ticker import FuncFormatter, MaxNLocator, FixedLocator, FixedFormatter
 
+# Below this much CSV data, starting worker processes costs more than it saves
+PROCESS_POOL_MIN_BYTES = 64 * 1024 * 1024
 
-def load_csv_data(file_path):
-    """Load and parse a single CSV file with equity data"""
-    try:
-        df = pd.read_csv(file_path, sep=';', header=None)
-        df.columns = ['Timestamp', 'Equity', 'Balance', 'Drawdown']
-        
-        # Parse timestamps - they are in UTC and need to be converted to Eastern time (EST/EDT)
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%Y.%m.%d %H:%M:%S')
-        
-        # Localize to UTC first, then convert to US/Eastern timezone
-        utc = pytz.timezone('UTC')
-        eastern = pytz.timezone('US/Eastern')
-        df['Timestamp'] = df['Timestamp'].dt.tz_localize(utc).dt.tz_convert(eastern)
-        
-        return df
-    except Exception as e:
-        print(f"Error loading {file_path}: {str(e)}")
-        return None
+# Layout of the semicolon-separated equity logs (no header row)
+CSV_COLUMNS = ['Timestamp', 'Equity', 'Balance', 'Drawdown']
+# Account values stay float64: float32 steps are coarser than a cent above about $131k,
+# which would put wrong cents into the exported results. Drawdown is a ratio, so float32 is enough.
+CSV_DTYPES = {'Equity': 'float64', 'Balance': 'float64', 'Drawdown': 'float32'}
+
+# The daily statistics never look at Drawdown, so it is not materialized
+DAILY_COLUMNS = ['Timestamp', 'Equity', 'Balance']
+
+# Rows parsed at a time, so memory use stays flat however large a log grows
+CSV_CHUNK_ROWS = 1_000_000
+
+# Columns of the per-day results table, in export order
+RESULT_COLUMNS = ['max_floating_negative_balance', 'max_floating_timestamp', 'min_equity',
+                  'max_balance', 'daily_gain', 'initial_balance', 'final_balance',
+                  'data_points', 'date', 'filename']
+
+# Per-directory cache of results for files that have not changed since the last run.
+# Bump the version whenever the statistics computed for a file change.
+RESULTS_CACHE_FILENAME = '.dea_cache.json'
+RESULTS_CACHE_VERSION = 5
+
+# Date embedded in log filenames, e.g. EquityLogClean_YYYY-MM-DD.csv
+_FILENAME_DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+# Timestamps are logged in UTC and reported in Eastern time (EST/EDT)
+_UTC = pytz.utc
+_EASTERN = pytz.timezone('US/Eastern')
+
+
+def load_csv_data(file_path, chunksize=CSV_CHUNK_ROWS):
+    """Load and parse a single CSV file with equity data, yielding DataFrames of at most chunksize rows"""
+    # memory_map lets the C parser read straight from the OS page cache
+    with pd.read_csv(file_path, sep=';', header=None, names=CSV_COLUMNS, usecols=DAILY_COLUMNS,
+                     dtype=CSV_DTYPES, engine='c', chunksize=chunksize, memory_map=True) as reader:
+        for df in reader:
+            # Parse timestamps as naive UTC - only the ones that end up in the results
+            # are converted to Eastern time (see calculate_max_floating_negative_balance)
+            df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='%Y.%m.%d %H:%M:%S', cache=True)
+            
+            yield df
 
 
 def extract_date_from_filename(filename):
     """Extract date from filename in format EquityLogClean_YYYY-MM-DD.csv"""
-    match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
+    match = _FILENAME_DATE_RE.search(filename)
     if match:
-        return datetime.strptime(match.group(1), '%Y-%m-%d').date()
+        s = match.group(1)
+        return date(int(s[0:4]), int(s[5:7]), int(s[8:10]))
     return None
 
 
+def _day_stats(equity, balance):
+    """Reduce one day's equity/balance arrays to (max floating loss, its index, min equity, max balance)"""
+    # Floating Loss - difference between Balance and Equity (when Balance > Equity)
+    floating_loss = balance - equity
+    max_floating_idx = int(floating_loss.argmax())
+    return floating_loss[max_floating_idx], max_floating_idx, equity.min(), balance.max()
+
+
 def calculate_max_floating_negative_balance(df):
     """Calculate the maximum floating negative balance for a single day's data"""
-    # Calculate Floating Loss - difference between Balance and Equity (when Balance > Equity)
-    df['Floating_Loss'] = df['Balance'] - df['Equity']
+    equity = df['Equity'].to_numpy()
+    balance = df['Balance'].to_numpy()
     
-    # Maximum floating loss during the day
-    max_floating_loss = df['Floating_Loss'].max()
+    # Maximum floating loss during the day and the row where it occurred,
+    # plus the equity/balance extremes, all from the same arrays
+    max_floating_loss, max_floating_idx, min_equity, max_balance = _day_stats(equity, balance)
     
     # Convert to negative to represent a loss (max negative balance)
     max_floating_negative_balance = max_floating_loss * -1
     
-    # Find the timestamp when this maximum occurred
-    max_floating_idx = df['Floating_Loss'].idxmax()
-    max_floating_timestamp = df.loc[max_floating_idx, 'Timestamp']
+    # Find the timestamp when this maximum occurred - it is in UTC and needs to be
+    # converted to Eastern time (EST/EDT). Index the raw datetime64 array by position.
+    max_floating_timestamp = pd.Timestamp(df['Timestamp'].to_numpy()[max_floating_idx])
+    max_floating_timestamp = max_floating_timestamp.tz_localize(_UTC).tz_convert(_EASTERN)
     
     # Additional statistics
-    min_equity = df['Equity'].min()
-    max_balance = df['Balance'].max()
-    initial_balance = df['Balance'].iloc[0]
-    final_balance = df['Balance'].iloc[-1]
+    initial_balance = balance[0]
+    final_balance = balance[-1]
     daily_gain = final_balance - initial_balance
     
+    # Plain floats keep the results free of NumPy scalars (the cache is JSON)
     return {
-        'max_floating_negative_balance': max_floating_negative_balance,
+        'max_floating_negative_balance': float(max_floating_negative_balance),
         'max_floating_timestamp': max_floating_timestamp,
-        'min_equity': min_equity,
-        'max_balance': max_balance,
-        'daily_gain': daily_gain,
-        'initial_balance': initial_balance,
-        'final_balance': final_balance,
+        'min_equity': float(min_equity),
+        'max_balance': float(max_balance),
+        'daily_gain': float(daily_gain),
+        'initial_balance': float(initial_balance),
+        'final_balance': float(final_balance),
         'data_points': len(df)
     }
 
 
-def process_all_csv_files(directory_path):
-    """Process all CSV files in the directory and calculate daily statistics"""
+def _merge_day_stats(stats, chunk_stats):
+    """Fold the statistics of a later chunk of the same day's data into stats"""
+    # Strict comparison keeps the earliest occurrence, matching argmax within a chunk
+    if chunk_stats['max_floating_negative_balance'] < stats['max_floating_negative_balance']:
+        stats['max_floating_negative_balance'] = chunk_stats['max_floating_negative_balance']
+        stats['max_floating_timestamp'] = chunk_stats['max_floating_timestamp']
+    
+    stats['min_equity'] = min(stats['min_equity'], chunk_stats['min_equity'])
+    stats['max_balance'] = max(stats['max_balance'], chunk_stats['max_balance'])
+    stats['final_balance'] = chunk_stats['final_balance']
+    stats['daily_gain'] = stats['final_balance'] - stats['initial_balance']
+    stats['data_points'] += chunk_stats['data_points']
+    
+    return stats
+
+
+def _process_one(csv_file):
+    """Load and analyze a single CSV file, returning (filename, date, stats, load_failed)"""
+    filename = os.path.basename(csv_file)
+    date = extract_date_from_filename(filename)
+    
+    if date is None:
+        return filename, None, None, False
+    
+    # Reduce the file chunk by chunk so the whole day never has to be in memory
+    stats = None
+    try:
+        for df in load_csv_data(csv_file):
+            if df.empty:
+                continue
+            chunk_stats = calculate_max_floating_negative_balance(df)
+            stats = chunk_stats if stats is None else _merge_day_stats(stats, chunk_stats)
+    except Exception as e:
+        print(f"Error loading {csv_file}: {str(e)}")
+        return filename, date, None, True
+    
+    if stats is None:
+        return filename, date, None, False
+    
+    stats['date'] = date
+    stats['filename'] = filename
+    
+    return filename, date, stats, False
+
+
+def _load_results_cache(cache_path):
+    """Load cached per-file results, keyed by filename, or an empty dict if unavailable"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    if not isinstance(cache, dict) or cache.get('version') != RESULTS_CACHE_VERSION:
+        return {}
+    
+    # Rebuild the (cache key, result) pairs process_all_csv_files compares against
+    entries = {}
+    try:
+        for filename, entry in cache.get('entries', {}).items():
+            file_date = date.fromisoformat(entry['date']) if entry['date'] is not None else None
+            stats = entry['stats']
+            if stats is not None:
+                stats['date'] = file_date
+                stats['max_floating_timestamp'] = pd.Timestamp(stats['max_floating_timestamp']).tz_convert(_EASTERN)
+            entries[filename] = (tuple(entry['key']), (filename, file_date, stats, False))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return {}
+    return entries
+
+
+def _save_results_cache(cache_path, entries):
+    """Persist per-file results for the next run, warning if the directory is not writable"""
+    # Dates and timestamps are stored as ISO strings so the cache is plain JSON
+    serialized = {}
+    for filename, (key, (_, file_date, stats, _)) in entries.items():
+        if stats is not None:
+            stats = dict(stats, date=stats['date'].isoformat(),
+                         max_floating_timestamp=stats['max_floating_timestamp'].isoformat())
+        serialized[filename] = {'key': list(key),
+                                'date': file_date.isoformat() if file_date is not None else None,
+                                'stats': stats}
+    
+    # Write beside the cache and swap it in, so an interrupted run never leaves a truncated file
+    tmp_path = cache_path + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': RESULTS_CACHE_VERSION, 'entries': serialized}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: could not write results cache {cache_path}: {str(e)}")
+
+
+def process_all_csv_files(directory_path, use_cache=True):
+    """Process all CSV files in the directory and return a DataFrame of daily statistics sorted by date"""
     # Find all CSV files in the directory
     csv_pattern = os.path.join(directory_path, "*.csv")
+    # Directory order is fine here - the results are sorted by date once at the end
     csv_files = glob.glob(csv_pattern)
     
     if not csv_files:
@@ -86,48 +218,77 @@ def process_all_csv_files(directory_path):
     
     print(f"Found {len(csv_files)} CSV files to process...")
     
-    daily_results = []
-    
-    for csv_file in sorted(csv_files):
-        filename = os.path.basename(csv_file)
-        date = extract_date_from_filename(filename)
+    # Collect results column by column so the DataFrame is built without per-row inference
+    daily_results = {column: [] for column in RESULT_COLUMNS}
+    
+    # Files whose modification time and size match the cache are not re-read
+    cache_path = os.path.join(directory_path, RESULTS_CACHE_FILENAME)
+    cache = _load_results_cache(cache_path) if use_cache else {}
+    cache_keys = {}
+    for csv_file in csv_files:
+        st = os.stat(csv_file)
+        cache_keys[csv_file] = (st.st_mtime_ns, st.st_size)
+    
+    pending = [csv_file for csv_file in csv_files
+               if cache.get(os.path.basename(csv_file), (None, None))[0] != cache_keys[csv_file]]
+    if len(pending) < len(csv_files):
+        print(f"Reusing cached results for {len(csv_files) - len(pending)} unchanged files...")
+    
+    # Files are independent, so analyze them in parallel. Small batches use threads
+    # because spawning worker processes would dominate the run time.
+    total_bytes = sum(cache_keys[csv_file][1] for csv_file in pending)
+    executor_class = ProcessPoolExecutor if total_bytes >= PROCESS_POOL_MIN_BYTES else ThreadPoolExecutor
+    
+    new_cache = {}
+    with executor_class(max_workers=os.cpu_count()) as executor:
+        # Results come back in the order of pending, which follows csv_files
+        computed = executor.map(_process_one, pending, chunksize=4)
         
-        if date is None:
-            print(f"Could not extract date from filename: {filename}")
-            continue
+        for csv_file in csv_files:
+            cached = cache.get(os.path.basename(csv_file))
+            if cached is not None and cached[0] == cache_keys[csv_file]:
+                result = cached[1]
+            else:
+                result = next(computed)
             
-        print(f"Processing {filename} (Date: {date})...")
-        
-        df = load_csv_data(csv_file)
-        if df is None or df.empty:
-            print(f"Skipping {filename} - no valid data")
-            continue
+            # A failed read may be transient (e.g. the file was locked), so it is retried next run
+            filename, date, stats, load_failed = result
+            if not load_failed:
+                new_cache[filename] = (cache_keys[csv_file], result)
             
-        stats = calculate_max_floating_negative_balance(df)
-        stats['date'] = date
-        stats['filename'] = filename
-        
-        daily_results.append(stats)
-        
-        # Note: Following the rule about XAUEUR having higher ask/bid prices than XAUUSD
-        print(f"  Max floating negative balance: ${stats['max_floating_negative_balance']:,.2f}")
-        print(f"  Data points: {stats['data_points']}")
+            if date is None:
+                print(f"Could not extract date from filename: {filename}")
+                continue
+                
+            print(f"Processing {filename} (Date: {date})...")
+            
+            if stats is None:
+                print(f"Skipping {filename} - no valid data")
+                continue
+            
+            for column in RESULT_COLUMNS:
+                daily_results[column].append(stats[column])
+            
+            # Note: Following the rule about XAUEUR having higher ask/bid prices than XAUUSD
+            print(f"  Max floating negative balance: ${stats['max_floating_negative_balance']:,.2f}")
+            print(f"  Data points: {stats['data_points']}")
+    
+    if use_cache:
+        _save_results_cache(cache_path, new_cache)
     
-    return daily_results
+    return pd.DataFrame(daily_results).sort_values('date', kind='stable', ignore_index=True)
 
 
 def plot_daily_max_floating_balances(daily_results, save_path=None):
     """Create a comprehensive visualization of daily maximum floating negative balances"""
-    if not daily_results:
+    if daily_results is None or daily_results.empty:
         print("No data to plot")
         return
     
-    # Sort by date
-    daily_results = sorted(daily_results, key=lambda x: x['date'])
-    
-    dates = [result['date'] for result in daily_results]
-    max_floating_balances = [result['max_floating_negative_balance'] for result in daily_results]
-    daily_gains = [result['daily_gain'] for result in daily_results]
+    # Results arrive sorted by date from process_all_csv_files
+    dates = daily_results['date'].to_numpy()
+    max_floating_balances = daily_results['max_floating_negative_balance'].to_numpy()
+    daily_gains = daily_results['daily_gain'].to_numpy()
     
     # Create figure with subplots
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 12))
@@ -138,7 +299,7 @@ def plot_daily_max_floating_balances(daily_results, save_path=None):
                  fontsize=16, fontweight='bold', y=0.98)
     
     # Top plot: Maximum Floating Negative Balance by Day
-    bars1 = ax1.bar(dates, [abs(bal) for bal in max_floating_balances], 
+    bars1 = ax1.bar(dates, np.abs(max_floating_balances), 
                     color='red', alpha=0.7, edgecolor='black', width=0.8)
     
     ax1.set_title('Maximum Floating Negative Balance by Day', fontsize=14, fontweight='bold')
@@ -146,15 +307,16 @@ def plot_daily_max_floating_balances(daily_results, save_path=None):
     ax1.grid(True, axis='y', alpha=0.3)
     
     # Add value labels on top of bars
+    label_offset = np.abs(max_floating_balances).max()*0.01
     for i, (bar, balance) in enumerate(zip(bars1, max_floating_balances)):
-        ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(abs(bal) for bal in max_floating_balances)*0.01,
+        ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + label_offset,
                 f'${balance:,.2f}', ha='center', va='bottom', fontweight='bold', fontsize=10, rotation=0)
     
     # Format x-axis
     ax1.tick_params(axis='x', rotation=45, labelsize=10)
     
     # Bottom plot: Daily Gains/Losses
-    colors = ['green' if gain >= 0 else 'red' for gain in daily_gains]
+    colors = np.where(daily_gains >= 0, 'green', 'red')
     bars2 = ax2.bar(dates, daily_gains, color=colors, alpha=0.7, edgecolor='black', width=0.8)
     
     ax2.set_title('Daily Gain/Loss by Day', fontsize=14, fontweight='bold')
@@ -164,8 +326,11 @@ def plot_daily_max_floating_balances(daily_results, save_path=None):
     ax2.axhline(y=0, color='black', linestyle='-', alpha=0.3)
     
     # Add value labels on bars
+    gain_span = daily_gains.max() - daily_gains.min()
+    positive_offset = gain_span*0.01
+    negative_offset = gain_span*0.03
     for i, (bar, gain) in enumerate(zip(bars2, daily_gains)):
-        label_y = bar.get_height() + (max(daily_gains) - min(daily_gains))*0.01 if gain >= 0 else bar.get_height() - (max(daily_gains) - min(daily_gains))*0.03
+        label_y = bar.get_height() + positive_offset if gain >= 0 else bar.get_height() - negative_offset
         ax2.text(bar.get_x() + bar.get_width()/2, label_y,
                 f'${gain:,.2f}', ha='center', va='bottom' if gain >= 0 else 'top', 
                 fontweight='bold', fontsize=10, rotation=0)
@@ -177,11 +342,21 @@ def plot_daily_max_floating_balances(daily_results, save_path=None):
     
     if save_path:
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        plt.close(fig)
         print(f"Chart saved to: {save_path}")
     else:
         plt.show()
 
 
+def _count_csv_files(path):
+    """Count the files in path that glob's "*.csv" would match, from a single directory scan"""
+    with os.scandir(path) as entries:
+        return sum(1 for entry in entries
+                   if not entry.name.startswith('.')
+                   and os.path.normcase(entry.name).endswith('.csv')
+                   and entry.is_file())
+
+
 def show_available_directories():
     """Show some common directories that might contain CSV files"""
     base_path = r"C:\Users\maste\OneDrive\Documentos\archived_logs"
@@ -189,13 +364,13 @@ def show_available_directories():
     print("\nLooking for available directories in archived_logs...")
     if os.path.exists(base_path):
         try:
-            subdirs = [d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d))]
+            with os.scandir(base_path) as entries:
+                subdirs = [entry for entry in entries if entry.is_dir()]
             if subdirs:
                 print(f"\nFound directories in {base_path}:")
                 for i, subdir in enumerate(subdirs, 1):
-                    full_path = os.path.join(base_path, subdir)
-                    csv_count = len(glob.glob(os.path.join(full_path, "*.csv")))
-                    print(f"  {i}. {subdir} ({csv_count} CSV files)")
+                    csv_count = _count_csv_files(subdir.path)
+                    print(f"  {i}. {subdir.name} ({csv_count} CSV files)")
             else:
                 print(f"No subdirectories found in {base_path}")
         except PermissionError:
@@ -206,11 +381,11 @@ def show_available_directories():
 
 def print_summary_statistics(daily_results):
     """Print summary statistics for all days"""
-    if not daily_results:
+    if daily_results is None or daily_results.empty:
         return
     
-    max_floating_balances = [result['max_floating_negative_balance'] for result in daily_results]
-    daily_gains = [result['daily_gain'] for result in daily_results]
+    max_floating_balances = daily_results['max_floating_negative_balance'].tolist()
+    daily_gains = daily_results['daily_gain'].tolist()
     
     print("\n" + "="*80)
     print("SUMMARY STATISTICS")
@@ -224,7 +399,7 @@ def print_summary_statistics(daily_results):
     
     # Find the worst day
     worst_day_idx = max_floating_balances.index(min(max_floating_balances))
-    worst_day = daily_results[worst_day_idx]
+    worst_day = daily_results.iloc[worst_day_idx]
     print(f"\nWorst day: {worst_day['date']} ({worst_day['filename']})")
     print(f"  Max floating negative balance: ${worst_day['max_floating_negative_balance']:,.2f}")
     print(f"  Daily gain/loss: ${worst_day['daily_gain']:,.2f}")
@@ -277,6 +452,12 @@ Examples:
         help='Skip saving detailed results to CSV'
     )
     
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Reprocess every CSV file instead of reusing cached results for unchanged files'
+    )
+    
     # Parse arguments
     args = parser.parse_args()
     
@@ -310,9 +491,9 @@ Examples:
     print(f"Looking for CSV files in: {csv_directory}")
     
     # Process all CSV files
-    daily_results = process_all_csv_files(csv_directory)
+    daily_results = process_all_csv_files(csv_directory, use_cache=not args.no_cache)
     
-    if not daily_results:
+    if daily_results is None or daily_results.empty:
         print("No data processed. Exiting.")
         return
     
@@ -322,6 +503,8 @@ Examples:
     # Create visualization (if not disabled)
     if not args.no_chart:
         print("\nGenerating visualization...")
+        # The chart is only written to disk, so skip loading an interactive GUI backend
+        matplotlib.use('Agg')
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         save_path = os.path.join(os.path.dirname(__file__), f"{args.output_prefix}_{timestamp}.png")
         plot_daily_max_floating_balances(daily_results, save_path)
@@ -330,7 +513,7 @@ Examples:
     
     # Save detailed results to CSV (if not disabled)
     if not args.no_csv:
-        results_df = pd.DataFrame(daily_results)
+        results_df = daily_results
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         results_csv_path = os.path.join(os.path.dirname(__file__), f"{args.output_prefix}_results_{timestamp}.csv")
         results_df.to_csv(results_csv_path, index=False)
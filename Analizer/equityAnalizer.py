@@ -1,68 +1,167 @@
+import os
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 import matplotlib.dates as mdates
-import pytz
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from zoneinfo import ZoneInfo
 from matplotlib.ticker import FuncFormatter, MaxNLocator, FixedLocator, FixedFormatter, NullLocator, NullFormatter
 
+# Timestamps are logged in UTC and reported in Eastern time (EST/EDT)
+_EASTERN = ZoneInfo('US/Eastern')
 
-# Load and parse the CSV file
-def load_data(file_path):
-    df = pd.read_csv(file_path, sep=';', header=None)
-    df.columns = ['Timestamp', 'Equity', 'Balance', 'Drawdown']
+
+# Logs at least this large are streamed in chunks of CHUNK_ROWS rows by the script entry point.
+# The rows kept so far are cut down to their STREAM_M4_BINS-bucket M4 points as each chunk
+# arrives, so memory stays bounded by the chunk size whatever the length of the log. Those
+# buckets are several times finer than the chart's, so the chart is visually equivalent to
+# one drawn from the full log, and every extreme, first and last row is kept exactly.
+STREAM_MIN_BYTES = 512 * 1024 * 1024
+CHUNK_ROWS = 1_000_000
+STREAM_M4_BINS = 8192
+
+
+# Load and parse the CSV file. With chunksize set the log is streamed and only the rows
+# the analysis needs are kept (see _reduce_rows)
+def load_data(file_path, chunksize=None):
+    # Equity and Balance stay float64: float32 steps are coarser than a cent above about $131k.
+    # Drawdown is a ratio, so float32 is enough for it.
+    # memory_map lets the C parser read straight from the OS page cache.
+    read_options = dict(sep=';', header=None,
+                        names=['Timestamp', 'Equity', 'Balance', 'Drawdown'],
+                        dtype={'Equity': 'float64', 'Balance': 'float64', 'Drawdown': 'float32'},
+                        engine='c', memory_map=True)
+    
+    if chunksize is None:
+        df = pd.read_csv(file_path, **read_options)
+        df['Timestamp'] = _parse_timestamps(df['Timestamp'])
+        return df
+    
+    # Re-reduce the kept rows together with each new chunk over the span read so far, so the
+    # buckets always cover the whole log and at most STREAM_M4_BINS of them are held
+    kept = None
+    with pd.read_csv(file_path, chunksize=chunksize, **read_options) as reader:
+        for chunk in reader:
+            chunk['Timestamp'] = _parse_timestamps(chunk['Timestamp'])
+            if kept is not None:
+                chunk = pd.concat([kept, chunk], ignore_index=True)
+            kept = _reduce_rows(chunk)
+    return kept.reset_index(drop=True)
+
+
+# Parse timestamps - they are in UTC and need to be converted to Eastern time (EST/EDT)
+# Parsing straight to UTC avoids a separate tz_localize pass over the column
+def _parse_timestamps(column):
+    return pd.to_datetime(column, format='%Y.%m.%d %H:%M:%S',
+                          utc=True, cache=True).dt.tz_convert(_EASTERN)
+
+
+# Keep only the union of the M4 points of every series plot_combined_equity_analysis
+# draws or reduces (Equity, Balance, the Balance - Equity floating loss and Drawdown)
+def _reduce_rows(df):
+    time_ns = df['Timestamp'].values.view(np.int64)
+    equity = df['Equity'].to_numpy()
+    balance = df['Balance'].to_numpy()
+    series = (equity, balance, balance - equity, df['Drawdown'].to_numpy())
+    keep = np.unique(np.concatenate([m4_indices(time_ns, y, STREAM_M4_BINS) for y in series]))
+    return df.iloc[keep]
+
+
+# M4 decimation: indices of the first, last, min and max point of y in each of n_bins
+# equal-width time buckets. A line drawn through just these points renders the same as
+# the full series at n_bins pixels wide. x must be sorted int64 timestamps.
+def m4_indices(x, y, n_bins):
+    n = len(y)
+    if n <= 4 * n_bins:
+        return np.arange(n)
+    
+    span = x[-1] - x[0]
+    if span > 0:
+        bins = np.minimum(((x - x[0]) / span * n_bins).astype(np.int64), n_bins - 1)
+    else:
+        bins = np.arange(n) * n_bins // n
     
-    # Parse timestamps - they are in UTC and need to be converted to Eastern time (EST/EDT)
-    df['Timestamp'] = pd.to_datetime(df['Timestamp'],
-                                     format='%Y.%m.%d %H:%M:%S')
+    # The series is time ordered, so each bucket is a contiguous run of rows
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
     
-    # Localize to UTC first, then convert to US/Eastern timezone
-    utc = pytz.timezone('UTC')
-    eastern = pytz.timezone('US/Eastern')
+    # First row in each bucket that hits the bucket's min / max
+    picked = [starts, ends]
+    for extreme in (np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)):
+        hits = np.flatnonzero(y == extreme[group])
+        _, first_hit = np.unique(group[hits], return_index=True)
+        picked.append(hits[first_hit])
     
-    # Localize to UTC first, then convert to Eastern time
-    df['Timestamp'] = df['Timestamp'].dt.tz_localize(utc).dt.tz_convert(eastern)
+    return np.unique(np.concatenate(picked))
+
+
+# Figure and axes grid for plot_combined_equity_analysis. A headless figure is drawn straight
+# onto an Agg canvas and never registered with pyplot, so saving to a file needs no GUI backend.
+# A fresh figure is built per call: reusing one after cla() is not byte-identical between renders.
+def _create_figure(figsize, headless=False):
+    # Make it slightly wider to accommodate wider left panel
+    if headless:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    else:
+        fig = plt.figure(figsize=figsize)
+    
+    # Left side: Bar chart (slightly smaller width - using 7-column layout)
+    ax1 = fig.add_subplot(1, 7, (1, 2))  # Span columns 1 and 2 to make it moderately wide
     
-    return df
+    # Right side: Time series plots (5/7 of the width)
+    ax2_span = fig.add_subplot(2, 7, (3, 7))  # Span columns 3, 4, 5, 6, and 7
+    ax3 = fig.add_subplot(2, 7, (10, 14))  # Span columns 3, 4, 5, 6, and 7 on bottom row
+    
+    return fig, ax1, ax2_span, ax3
 
 
 # Combined plot showing both bar chart and time series
 def plot_combined_equity_analysis(df, save_path=None):
+    # Pull the columns out once; every statistic below is a single pass over these arrays
+    equity = df['Equity'].to_numpy()
+    balance = df['Balance'].to_numpy()
+    
     # Calculate extremes for bar chart
-    min_equity = df['Equity'].min()
-    max_equity = df['Equity'].max()
-    max_balance = df['Balance'].max()
-    min_equity_date = df.loc[df['Equity'].idxmin(), 'Timestamp']
-    max_balance_date = df.loc[df['Balance'].idxmax(), 'Timestamp']
+    min_equity_idx = equity.argmin()
+    max_balance_idx = balance.argmax()
+    min_equity = equity[min_equity_idx]
+    max_balance = balance[max_balance_idx]
+    timestamps = df['Timestamp']
+    min_equity_date = timestamps.iat[min_equity_idx]
+    max_balance_date = timestamps.iat[max_balance_idx]
     
     # Calculate Gain (final balance - initial balance)
-    initial_balance = df['Balance'].iloc[0]
-    final_balance = df['Balance'].iloc[-1]
+    initial_balance = balance[0]
+    final_balance = balance[-1]
     gain = final_balance - initial_balance
     
     # Calculate Max Floating (negative) Balance - maximum unrealized loss during open positions
     # This represents the largest difference between Balance and Equity (when Balance > Equity)
-    df['Floating_Loss'] = df['Balance'] - df['Equity']
-    max_floating_loss = df['Floating_Loss'].max()
+    # Kept as a plain NumPy array rather than a new DataFrame column
+    floating_loss = balance - equity
+    max_floating_idx = floating_loss.argmax()
+    max_floating_loss = floating_loss[max_floating_idx]
     max_floating_balance = max_floating_loss * -1  # Make it negative to represent a loss
-    max_floating_date = df.loc[df['Floating_Loss'].idxmax(), 'Timestamp']
+    max_floating_date = timestamps.iat[max_floating_idx]
     
-    # Calculate time interval for title
-    first_timestamp = df['Timestamp'].min()
-    last_timestamp = df['Timestamp'].max()
+    # Calculate time interval for title (the log is written in time order)
+    first_timestamp = timestamps.iat[0]
+    last_timestamp = timestamps.iat[-1]
     duration = last_timestamp - first_timestamp
     
-    # Create figure with subplots (make it slightly wider to accommodate wider left panel)
-    fig = plt.figure(figsize=(21, 10))
+    # Create the figure with its subplots
+    fig, ax1, ax2_span, ax3 = _create_figure((21, 10), headless=bool(save_path))
     
     # Add main title with data interval (showing EST/EDT timezone)
     first_tz = first_timestamp.strftime('%Z')  # Get timezone abbreviation (EST or EDT)
     interval_title = f"Data Interval: {first_timestamp.strftime('%Y.%m.%d %H:%M:%S')} to {last_timestamp.strftime('%Y.%m.%d %H:%M:%S')} {first_tz} (Duration: {duration})"
     fig.suptitle(interval_title, fontsize=16, fontweight='bold', y=0.98)
     
-    # Left side: Bar chart (slightly smaller width - using 7-column layout)
-    ax1 = plt.subplot(1, 7, (1, 2))  # Span columns 1 and 2 to make it moderately wide
-    
+    # Left side: Bar chart
     # Create bar graph with 4 bars
     categories = ['Lowest\nEquity', 'Highest\nBalance', 'Gain', 'Max Floating\nBalance']
     # For display purposes, show Max Floating Balance as positive (upward bar) but keep the actual negative value for labeling
@@ -110,12 +209,18 @@ def plot_combined_equity_analysis(df, save_path=None):
     # Rotate x-axis labels for better readability
     ax1.tick_params(axis='x', rotation=15, labelsize=9)
     
-    # Right side: Time series plots (5/7 of the width)
-    # Equity and Balance
-    ax2_span = plt.subplot(2, 7, (3, 7))  # Span columns 3, 4, 5, 6, and 7
-    
-    ax2_span.plot(df['Timestamp'], df['Equity'], label='Equity', color='blue', linewidth=1.5)
-    ax2_span.plot(df['Timestamp'], df['Balance'], label='Balance', color='green', linestyle='--', linewidth=1.5)
+    # Right side, top: Equity and Balance
+    # Only draw the points that can be told apart at the rendered width (M4 decimation)
+    dpi = 150 if save_path else fig.dpi
+    # Bucket for the full 5/7 of the figure width the panel spans, which is never fewer
+    # than its pixel columns and is known before the layout is computed
+    n_bins = int(fig.get_figwidth() * dpi * 5 / 7)
+    time_ns = timestamps.values.view(np.int64)
+    equity_idx = m4_indices(time_ns, equity, n_bins)
+    balance_idx = m4_indices(time_ns, balance, n_bins)
+    
+    ax2_span.plot(timestamps.iloc[equity_idx], equity[equity_idx], label='Equity', color='blue', linewidth=1.5)
+    ax2_span.plot(timestamps.iloc[balance_idx], balance[balance_idx], label='Balance', color='green', linestyle='--', linewidth=1.5)
     ax2_span.set_title('Equity vs Balance Over Time', fontsize=14, fontweight='bold')
     ax2_span.set_xlabel('Date and Time', fontsize=12)
     ax2_span.set_ylabel('Value ($)', fontsize=11)
@@ -123,8 +228,8 @@ def plot_combined_equity_analysis(df, save_path=None):
     ax2_span.grid(True, alpha=0.3)
     
     # Simple approach with FixedLocator and FixedFormatter
-    y_min = df['Equity'].min()
-    y_max = df['Balance'].max()
+    y_min = min_equity
+    y_max = max_balance
     
     # Create exactly 5 tick positions
     tick_positions = np.linspace(y_min, y_max, 5)
@@ -135,48 +240,27 @@ def plot_combined_equity_analysis(df, save_path=None):
     ax2_span.yaxis.set_major_formatter(FixedFormatter(tick_labels))
     ax2_span.yaxis.set_minor_locator(FixedLocator([]))  # No minor ticks
     
-    # Use FixedLocator and FixedFormatter for the axis structure
-    ax2_span.yaxis.set_major_locator(FixedLocator(tick_positions))
-    ax2_span.yaxis.set_major_formatter(FixedFormatter(tick_labels))
-    ax2_span.yaxis.set_minor_locator(FixedLocator([]))  # No minor ticks
-    
     # Style the ticks
     ax2_span.tick_params(axis='y', labelsize=10)
     
-    # Manually place our clean dollar labels for better visibility
-    for pos, label in zip(tick_positions, tick_labels):
-        ax2_span.text(-0.005, pos, label, transform=ax2_span.get_yaxis_transform(),
-                     ha='right', va='center', fontsize=10, color='black',
-                     bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
+    # Format x-axis in Eastern time with about a dozen ticks whatever the duration
+    span_locator = mdates.AutoDateLocator(tz=_EASTERN, maxticks=12)
+    ax2_span.xaxis.set_major_locator(span_locator)
+    ax2_span.xaxis.set_major_formatter(mdates.ConciseDateFormatter(span_locator, tz=_EASTERN))
     
-    # Format x-axis to show date and time in single line format (Eastern time)
-    eastern_tz = pytz.timezone('US/Eastern')
-    ax2_span.xaxis.set_major_formatter(mdates.DateFormatter('%m/%d %H:%M', tz=eastern_tz))
-    ax2_span.xaxis.set_major_locator(mdates.MinuteLocator(interval=30, tz=eastern_tz))  # Show every 30 minutes
-    
-    # Rotate labels for better readability and increase font size
-    ax2_span.tick_params(axis='x', rotation=45, labelsize=8)
-    
-    # Adjust layout to prevent label cutoff
-    plt.setp(ax2_span.xaxis.get_majorticklabels(), ha='right')
+    # Concise labels are short enough to stay horizontal
+    ax2_span.tick_params(axis='x', labelsize=8)
     
     # Drawdown (bottom right)
-    ax3 = plt.subplot(2, 7, (10, 14))  # Span columns 3, 4, 5, 6, and 7 on bottom row
-    ax3.plot(df['Timestamp'], df['Drawdown'], label='Drawdown', color='red', linewidth=1.5)
-    ax3.set_title('Drawdown Over Time', fontsize=14, fontweight='bold')
-    ax3.set_xlabel('Date and Time', fontsize=12)
-    ax3.set_ylabel('Drawdown (%)', fontsize=11)
-    ax3.legend(fontsize=10)
-    ax3.grid(True, alpha=0.3)
-    
     # Convert drawdown ratio to dollar amounts for better understanding
     # The drawdown data appears to be stored as (Balance - Equity) / Balance
     # Let's calculate and show actual dollar drawdown amounts
-    df['Dollar_Drawdown'] = df['Balance'] - df['Equity']
+    # Balance - Equity is exactly the floating loss computed above, so reuse that array
+    dollar_drawdown = floating_loss
     
     # Calculate range for drawdown ticks
-    dd_min = df['Dollar_Drawdown'].min()
-    dd_max = df['Dollar_Drawdown'].max()
+    dd_min = dollar_drawdown.min()
+    dd_max = max_floating_loss
     
     # Create 5 evenly spaced tick positions for drawdown
     dd_tick_positions = np.linspace(dd_min, dd_max, 5)
@@ -191,10 +275,9 @@ def plot_combined_equity_analysis(df, save_path=None):
         else:
             dd_tick_labels.append(f'${pos:.2f}')
     
-    # Map the original drawdown values to dollar amounts for plotting
-    # We need to plot df['Dollar_Drawdown'] instead of df['Drawdown']
-    ax3.clear()  # Clear and replot with correct data
-    ax3.plot(df['Timestamp'], df['Dollar_Drawdown'], label='Drawdown', color='red', linewidth=1.5)
+    # Plot the dollar drawdown rather than the stored df['Drawdown'] ratio
+    drawdown_idx = m4_indices(time_ns, dollar_drawdown, n_bins)
+    ax3.plot(timestamps.iloc[drawdown_idx], dollar_drawdown[drawdown_idx], label='Drawdown', color='red', linewidth=1.5)
     ax3.set_title('Drawdown Over Time', fontsize=14, fontweight='bold')
     ax3.set_xlabel('Date and Time', fontsize=12)
     ax3.set_ylabel('Drawdown ($)', fontsize=11)
@@ -206,20 +289,19 @@ def plot_combined_equity_analysis(df, save_path=None):
     ax3.yaxis.set_major_formatter(FixedFormatter(dd_tick_labels))
     ax3.yaxis.set_minor_locator(FixedLocator([]))  # No minor ticks
     
-    # Format x-axis to show date and time in single line format (Eastern time)
-    ax3.xaxis.set_major_formatter(mdates.DateFormatter('%m/%d %H:%M', tz=eastern_tz))
-    ax3.xaxis.set_major_locator(mdates.MinuteLocator(interval=30, tz=eastern_tz))  # Show every 30 minutes
+    # Format x-axis in Eastern time with about a dozen ticks whatever the duration
+    dd_locator = mdates.AutoDateLocator(tz=_EASTERN, maxticks=12)
+    ax3.xaxis.set_major_locator(dd_locator)
+    ax3.xaxis.set_major_formatter(mdates.ConciseDateFormatter(dd_locator, tz=_EASTERN))
     
-    # Rotate labels for better readability and increase font size
-    ax3.tick_params(axis='x', rotation=45, labelsize=8)
+    # Concise labels are short enough to stay horizontal
+    ax3.tick_params(axis='x', labelsize=8)
     
-    # Adjust layout to prevent label cutoff
-    plt.setp(ax3.xaxis.get_majorticklabels(), ha='right')
-    
-    plt.tight_layout(rect=[0, 0.03, 1, 0.95])  # Adjust layout to leave space for main title
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])  # Adjust layout to leave space for main title
     
     if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        # tight_layout above already fits the panels, so no extra bbox_inches='tight' render pass
+        fig.savefig(save_path, dpi=dpi)
         print(f"Chart saved to: {save_path}")
     else:
         plt.show()
@@ -230,20 +312,31 @@ def plot_combined_equity_analysis(df, save_path=None):
 # Example usage
 if __name__ == "__main__":
     file_path = 'EquityLogClean.csv'  # Replace with your actual file path
-    df = load_data(file_path)
+    # Stream very large logs so memory stays bounded by the chunk size
+    streamed = os.path.getsize(file_path) >= STREAM_MIN_BYTES
+    df = load_data(file_path, chunksize=CHUNK_ROWS if streamed else None)
     
     # Display data statistics for debugging
-    print(f"Data loaded: {len(df)} rows")
-    print(f"Equity range: ${df['Equity'].min():.2f} - ${df['Equity'].max():.2f}")
-    print(f"Balance range: ${df['Balance'].min():.2f} - ${df['Balance'].max():.2f}")
-    
-    # Check for any extreme outliers
-    equity_mean = df['Equity'].mean()
-    equity_std = df['Equity'].std()
-    outliers = df[(df['Equity'] > equity_mean + 3*equity_std) | (df['Equity'] < equity_mean - 3*equity_std)]
-    if len(outliers) > 0:
-        print(f"Warning: Found {len(outliers)} potential outliers in equity data:")
-        print(outliers[['Timestamp', 'Equity', 'Balance']].head())
+    # Reduce on the raw NumPy arrays rather than through the Series dispatch
+    equity = df['Equity'].to_numpy()
+    balance = df['Balance'].to_numpy()
+    drawdown = df['Drawdown'].to_numpy()
+    if streamed:
+        print(f"Data loaded: {len(df)} rows kept from a streamed log")
+    else:
+        print(f"Data loaded: {len(df)} rows")
+    print(f"Equity range: ${equity.min():.2f} - ${equity.max():.2f}")
+    print(f"Balance range: ${balance.min():.2f} - ${balance.max():.2f}")
+    
+    # Check for any extreme outliers (more than 3 standard deviations from the mean)
+    # The mean and spread need every row, so this is skipped for a streamed log
+    if not streamed:
+        equity_mean = equity.mean(dtype=np.float64)
+        equity_std = equity.std(dtype=np.float64, ddof=1)
+        outlier_rows = np.flatnonzero(np.abs(equity - equity_mean) > 3*equity_std)
+        if len(outlier_rows) > 0:
+            print(f"Warning: Found {len(outlier_rows)} potential outliers in equity data:")
+            print(df.iloc[outlier_rows[:5]][['Timestamp', 'Equity', 'Balance']])
     
     # Display time interval information
     first_timestamp = df['Timestamp'].min()
@@ -252,7 +345,7 @@ if __name__ == "__main__":
     timezone_abbr = first_timestamp.strftime('%Z')  # Get timezone abbreviation (EST or EDT)
     
     print(f"Data Interval: {first_timestamp.strftime('%Y.%m.%d %H:%M:%S')} to {last_timestamp.strftime('%Y.%m.%d %H:%M:%S')} {timezone_abbr} (Duration: {duration})")
-    print(f"Drawdown range: ${df['Drawdown'].min():.2f} - ${df['Drawdown'].max():.2f}")
+    print(f"Drawdown range: ${drawdown.min():.2f} - ${drawdown.max():.2f}")
     
     # Display combined equity analysis
     plot_combined_equity_analysis(df)